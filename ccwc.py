@@ -1,375 +1,841 @@
-import sys
-import os
-import stat
-import argparse
-import codecs
-from contextlib import contextmanager
-
-class CCWC:
-    """
-    A class to handle Word Count operations.
-    Encapsulates configuration (buffer size, encoding) and logic.
-    """
-    DEFAULT_BUFFER_SIZE = 64 * 1024
-
-    def __init__(self, buffer_size = DEFAULT_BUFFER_SIZE, encoding = 'utf-8'):
-        self.buffer_size = buffer_size
-        self.encoding = encoding
-
-    # Helper function (refactored)
-    def _read_chunks(self, file):
-        """Generator that yields chunks of data from a file object."""
-        while True:
-            chunk = file.read(self.buffer_size)
-            if not chunk: break
-            yield chunk
-
-    # Logical layer
-    def count_bytes(self, file):
-        """
-        Calculates the size of a file in bytes.
-        Callback function for "wc -c <filename>" command.
-        """
-        try:
-            fd = file.fileno()
-            file_stat = os.fstat(fd)
-
-            # If it is a pipe (S_ISFIFO), st_size is 0, so we must read content.
-            if stat.S_ISREG(file_stat.st_mode):
-                # Get file size directly from file descriptor metadata. O(1)
-                return file_stat.st_size
-            
-            else:
-                # Load the whole file into memory.
-                if self.buffer_size == 0:
-                    return len(file.read())
-                
-                total = 0
-                for chunk in self._read_chunks(file):
-                    total += len(chunk)
-                return total
-        
-        except (OSError, AttributeError):
-            # Fallback to streams that don't support stat (like stdin pipes).
-            if self.buffer_size == 0:
-                return len(file.read())
-                
-            total = 0
-            for chunk in self._read_chunks(file):
-                total += len(chunk)
-            return total
-        
-    def count_lines(self, file):
-        """
-        Calculates the size of a file in lines.
-        Callback function for "wc -l <filename>" command.
-        """
-        # Load the whole file into memory.
-        if self.buffer_size == 0:
-            return file.read().count(b'\n')
-                
-        total = 0
-        for chunk in self._read_chunks(file):
-            total += chunk.count(b'\n')
-
-        return total
-
-    def count_words(self, file):
-        """
-        Calculates the size of a file in words.
-        Callback function for "wc -w <filename>" command.
-        """
-        if self.buffer_size == 0:
-            try:
-                content = file.read().decode(self.encoding, errors = 'ignore')
-
-            except LookupError:
-                print(f"Error: Unknown encoding: '{self.encoding}'.")
-
-            except Exception:
-                file.seek(0)
-                content = str(file.read())
-
-            return len(content.split())
-
-        total = 0
-        # Check if the previous chunk ended with space.
-        last_char_was_space = True
-
-        for chunk in self._read_chunks(file):
-            words = chunk.split()
-            total += len(words)
-
-            # Check if the current chunk starts with space
-            first_char_is_space = chunk[0:1].isspace()
-
-            # If they both are word, it means we split a single word, so subtract 1.
-            if not last_char_was_space and not first_char_is_space:
-                total -= 1
-
-            last_char_was_space = chunk[-1:].isspace()
-
-        return total
-    
-    def count_chars(self, file):
-        """
-        Calculates the size of a file in characters.
-        Callback function for "wc -m <filename>" command.
-        """
-        if self.buffer_size == 0:
-            try:
-                return len(file.read().decode(self.encoding, errors = 'replace'))
-            
-            except LookupError:
-                print(f"Error: Unknown encoding: '{self.encoding}'.")
-
-            except Exception:
-                file.seek(0)
-                return len(str(file.read()))
-            
-        total = 0
-        
-        try:
-            # Multi-byte characters that might be split across chunk boundaries.
-            # For example, if a 3-byte character is split [byte1, byte2] | [byte3].
-            # The decoder will hold the first two bytes until the third one arrives.
-            decoder = codecs.getincrementaldecoder(self.encoding)(errors = 'replace')
-            total = 0
-            for chunk in self._read_chunks(file):
-                text = decoder.decode(chunk, final = False)
-                total += len(text)
-            total += len(decoder.decode(b'', final = True))
-            return total
-        
-        except LookupError:
-            print(f"Error: Unknown encoding: '{self.encoding}'.")
-
-        except Exception:
-            # Fallback if stream is not seekable
-            try:
-                file.seek(0)
-                return len(file.read())
-            except:
-                return 0
-            
-    def count_all(self, file):
-        """
-        Default Option: Calculates lines, words, bytes, and chars in one pass.
-        Optimized for single-pass reading (crucial for pipes/stdin).
-        Returns a dict: {'lines': int, 'words': int, 'bytes': int, 'chars': int}
-        """
-        totals = {'lines': 0, 'words': 0, 'chars': 0, 'bytes': 0}
-        # Helper objects for streaming logic
-        last_char_was_space = True
-        try:
-            decoder = codecs.getincrementaldecoder(self.encoding)(errors='replace')
-
-        except LookupError:
-            print(f"Error: Unknown encoding '{self.encoding}'")
-            sys.exit(1)
-
-        if self.buffer_size == 0:
-            content = file.read()
-            totals['lines'] = content.count(b'\n')
-            totals['bytes'] = len(content)
-
-            # words
-            try:
-                text_content = content.decode(self.encoding, errors='ignore')
-                totals['words'] = len(text_content.split())
-
-            except Exception:
-                totals['words'] = len(str(content).split())
-
-            # chars
-            try:
-                totals['chars'] = len(content.decode(self.encoding, errors = 'replace'))
-
-            except Exception:
-                totals['chars'] = len(str(content))
-            
-            return totals
-
-
-        for chunk in self._read_chunks(file):
-            totals['lines'] += chunk.count(b'\n')
-            totals['bytes'] += len(chunk)
-
-
-            # words
-            totals['words'] += len(chunk.split())
-            first_char_is_space = chunk[0:1].isspace()
-
-            if not last_char_was_space and not first_char_is_space:
-                totals['words'] -= 1
-
-            last_char_was_space = chunk[-1:].isspace()
-
-            # chars
-            text = decoder.decode(chunk, final = False)
-            totals['chars'] += len(text)
-        totals['chars']  += len(decoder.decode(b'', final = True))
-
-        return totals
-            
-# Infrastructure layer
-@contextmanager
-def get_stream(filename = None):
-    """
-    Context manager that yields a file object.
-    Open a file if filename is provided, otherwise yields stdin buffer.
-    Automatically closes the file if it was opened.
-    """
-    if filename:
-        try:
-            f = open(filename, 'rb')
-
-        except FileNotFoundError:
-            print(f"Error: File '{filename}' not found.")
-            sys.exit(1)
-
-        except PermissionError:
-            print(f"Error: Permission denied for reading '{filename}'.")
-            sys.exit(1)
-
-        except Exception as e:
-            print("Error: An unknown error occurred: {e}")
-            sys.exit(1)
-
-        try:
-            yield f
-
-        finally:
-            f.close()
-
-    else:
-        yield sys.stdin.buffer
-
-# Application layer
-def produce_count_result(args):
-    """Orchestrates the result based on parsed arguments."""
-
-    # Initialize the tool with configuration.
-    tool = CCWC(buffer_size = args.buffer_size, encoding = args.encoding)
-
-    request_commands = []
-    if args.lines: request_commands.append('lines')
-    if args.words: request_commands.append('words')
-    if args.chars: request_commands.append('chars')
-    if args.bytes: request_commands.append('bytes')
-
-    tool_map = {
-        'lines': tool.count_lines,
-        'words': tool.count_words,
-        'chars': tool.count_chars,
-        'bytes': tool.count_bytes
-    }
-
-    # Default to lines, words, bytes when no flags specified (like wc)
-    if not request_commands:
-        request_commands = ['lines', 'words', 'bytes']
-
-    # None is for stdin.
-    filenames = args.filenames if args.filenames else [None]
-                
-    total_counter = {'lines': 0, 'words': 0, 'chars': 0, 'bytes': 0}
-    # Dealing with files
-    for filename in filenames:
-        with get_stream(filename) as f:
-            #Use count_all() for multi-command.
-            if len(request_commands) > 1:
-                try:
-                    file_counter = tool.count_all(f)
-
-                    # Update totals
-                    for metric in total_counter:
-                        total_counter[metric] += file_counter.get(metric, 0)
-                        
-                    outputs = []
-                    for metric in request_commands:
-                        outputs.append(str(file_counter[metric]))
-                    if filename:
-                        print(f" {' '.join(outputs)} {filename}")
-                    else:
-                         print(f" {' '.join(outputs)}")
-                         return # stdin: single input, no totals needed
-
-                except Exception as e:
-                    print(f"Error during processing file '{filename}': {e}")
-                    continue
-
-            # Single flag → use dedicated function (avoids unnecessary computation).
-            elif len(request_commands) == 1:
-                try:
-                    metric = request_commands[0]
-                    func = tool_map[metric]
-                    result = func(f)
-                    if filename:
-                        print(f"  {result} {filename}")
-                        total_counter[metric] += result
-                    else:
-                        print(f"  {result}")
-                        return # stdin: single input, no totals needed
-                    
-                except Exception as e:
-                    print(f"Error during processing file '{filename}': {e}")
-                    continue
-        
-
-    # Print total if multiple files were processed.
-    if len(filenames) > 1:
-        outputs = []
-        for metric in request_commands:
-            outputs.append(str(total_counter[metric]))
-
-        print(f" {' '.join(outputs)} total")
-
-# Interface layer
-def create_parser():
-    """Creates and configures the argument parser."""
-    parser = argparse.ArgumentParser(
-        description = "ccsc - Build your own wc tool.",
-        prog = "ccwc"
-    )
-
-    parser.add_argument("-c", "--bytes", action = "store_true", help = "print the byte counts")
-    parser.add_argument("-l", "--lines", action = "store_true", help = "print the newline counts")
-    parser.add_argument("-w", "--words", action = "store_true", help = "print the word counts")
-    parser.add_argument("-m", "--chars", action = "store_true", help = "print the character counts")
-
-    parser.add_argument(
-        "--buffer-size",
-        type = int,
-        default = CCWC.DEFAULT_BUFFER_SIZE,
-        help="buffer size in bytes (default: 65536). Set 0 to read entire file at once."
-    )
-
-    parser.add_argument(
-        "--encoding",
-        default = 'utf-8',
-        help="encoding (default: utf-8)"
-    )
-
-    parser.add_argument(
-        "filenames",
-        nargs = '*',
-        help = "files to process (default: stdin)"
-    )
-
-    return parser
-
-# Entry point
-def main():
-    """
-    Main entry point for the ccwc tool.
-    Parsed command-line arguments and executes the requested operation.
-    """
-    parser = create_parser()
-    args = parser.parse_args()
-    try:
-        produce_count_result(args)
-    except KeyboardInterrupt:
-        sys.exit(130)
-
-if __name__ == "__main__":
+import sys
+import os
+import stat
+import codecs
+import functools
+import mmap
+import operator
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import ccwc_kernels
+
+try:
+    import _ccwc_scan
+
+except ImportError:
+    _ccwc_scan = None
+
+
+# Metric names are dict keys on every hot aggregation path; interning
+# them (and using these constants everywhere) lets dict lookups hit the
+# identity fast path instead of re-hashing/comparing the string.
+LINES = sys.intern('lines')
+WORDS = sys.intern('words')
+CHARS = sys.intern('chars')
+BYTES = sys.intern('bytes')
+METRICS = (LINES, WORDS, CHARS, BYTES)
+
+
+if _ccwc_scan is not None:
+    def _count_newlines(buf, end = None):
+        """Newline count via the SWAR C extension (8 bytes per step)."""
+        return _ccwc_scan.scan_newlines(memoryview(buf)[:end])
+
+else:
+    def _count_newlines(buf, end = None):
+        """Newline count fallback when the C extension is not built."""
+        return buf.count(b'\n', 0, end)
+
+
+# Maps UTF-8 continuation bytes (high bits 10) to 0 and everything else
+# to 1, so translate().count(0) counts continuation bytes at C speed.
+_UTF8_CONT_TBL = bytes(0 if 0x80 <= i <= 0xBF else 1 for i in range(256))
+
+
+def _is_utf8(encoding):
+    """
+    True if encoding names UTF-8 (including aliases like utf8).
+    False for unknown encodings too — the decoder paths own that error.
+    """
+    try:
+        return codecs.lookup(encoding).name == 'utf-8'
+    except LookupError:
+        return False
+
+
+def _count_continuation(chunk):
+    """
+    Count UTF-8 continuation bytes (high bits 10) in chunk.
+    chars = bytes - continuation bytes for UTF-8 data, so this is the
+    one counter behind every chars path — whichever flags are set, the
+    same file must always report the same character count.
+    """
+    if ccwc_kernels.HAVE_NUMPY:
+        a = ccwc_kernels.np.frombuffer(chunk, ccwc_kernels.np.uint8)
+        return int(((a & 0xC0) == 0x80).sum())
+    return chunk.translate(_UTF8_CONT_TBL).count(0)
+
+# Maps whitespace (the set bytes.split() uses) to 0 and everything else
+# to 1: words become runs of 1s, and counting b'\x00\x01' occurrences
+# counts word starts without materializing any word objects.
+_WS_TBL = bytes(0 if i in (9, 10, 11, 12, 13, 32) else 1 for i in range(256))
+
+
+@functools.lru_cache(maxsize = 16)
+def _compile_counter(metrics, utf8_chars = False):
+    """
+    Build a streaming counter specialized for one set of metrics.
+    count_all always pays for all four counters (and the UTF-8 decoder is
+    2-3x the cost of the other three combined); the generated function
+    contains only the statements the requested metrics need. With
+    utf8_chars the chars branch uses the same bytes-minus-continuation
+    counter as count_chars instead of the decoder, so -m stays
+    flag-independent. Compiled once per distinct combination per
+    process (lru_cache).
+    Returns an unbound function with the signature (self, file) -> dict.
+    """
+    need_lines = LINES in metrics
+    need_words = WORDS in metrics
+    need_chars = CHARS in metrics
+    need_bytes = BYTES in metrics
+    use_kernel = ccwc_kernels.HAVE_NUMBA and (need_lines or need_words)
+
+    src = ["def counter(self, file):"]
+    src.append("    lines = words = chars = bytes_ = 0")
+    if need_words or use_kernel:
+        src.append("    last_char_was_space = True")
+    if need_chars and not utf8_chars:
+        src.append("    try:")
+        src.append("        decoder = codecs.getincrementaldecoder(self.encoding)(errors = 'replace')")
+        src.append("    except LookupError:")
+        src.append("        print(f\"Error: Unknown encoding '{self.encoding}'\")")
+        src.append("        sys.exit(1)")
+
+    src.append("    for chunk in self._read_chunks(file):")
+    if need_bytes:
+        src.append("        bytes_ += len(chunk)")
+    if use_kernel:
+        src.append("        chunk_lines, chunk_words, last_char_was_space = ccwc_kernels.scan(")
+        src.append("            ccwc_kernels.np.frombuffer(chunk, ccwc_kernels.np.uint8),")
+        src.append("            last_char_was_space")
+        src.append("        )")
+        src.append("        lines += chunk_lines")
+        src.append("        words += chunk_words")
+    else:
+        if need_lines:
+            src.append("        lines += _count_newlines(chunk)")
+        if need_words:
+            src.append("        words += len(chunk.split())")
+            src.append("        if not last_char_was_space and not chunk[0:1].isspace():")
+            src.append("            words -= 1")
+            src.append("        last_char_was_space = chunk[-1:].isspace()")
+    if need_chars:
+        if utf8_chars:
+            src.append("        chars += len(chunk) - _count_continuation(chunk)")
+        else:
+            src.append("        chars += len(decoder.decode(chunk, final = False))")
+            src.append("    chars += len(decoder.decode(b'', final = True))")
+
+    locals_for = {LINES: 'lines', WORDS: 'words', CHARS: 'chars', BYTES: 'bytes_'}
+    result = ", ".join(f"'{m}': {locals_for[m]}"
+                       for m in METRICS if m in metrics)
+    src.append("    return {%s}" % result)
+
+    namespace = {}
+    exec(compile("\n".join(src), '<ccwc counter>', 'exec'), globals(), namespace)
+    return namespace['counter']
+
+
+class CCWC:
+    """
+    A class to handle Word Count operations.
+    Encapsulates configuration (buffer size, encoding) and logic.
+    """
+    DEFAULT_BUFFER_SIZE = 64 * 1024
+
+    def __init__(self, buffer_size = DEFAULT_BUFFER_SIZE, encoding = 'utf-8', direct_io = False):
+        # O_DIRECT bypasses the page cache, so whole-file reads (buffer_size
+        # 0) cannot be used with it; fall back to the default chunk size.
+        # Its reads also EINVAL unless the length is a multiple of the
+        # device block size, so round odd sizes up to a whole page.
+        if direct_io and buffer_size == 0:
+            buffer_size = self.DEFAULT_BUFFER_SIZE
+        if direct_io and buffer_size % mmap.PAGESIZE:
+            buffer_size += mmap.PAGESIZE - buffer_size % mmap.PAGESIZE
+        self.buffer_size = buffer_size
+        self.encoding = encoding
+        self.direct_io = direct_io
+
+    def _new_buffer(self):
+        """
+        Allocate a read buffer. O_DIRECT requires the buffer to be aligned
+        to the device block size; anonymous mmap allocations are
+        page-aligned, which satisfies that. Plain bytearray otherwise.
+        """
+        if self.direct_io:
+            return mmap.mmap(-1, self.buffer_size)
+        return bytearray(self.buffer_size)
+
+    # Helper function (refactored)
+    def _read_chunks(self, file):
+        """
+        Generator that yields chunks of data from a file object.
+        Reads go via readinto() into one reused buffer, skipping the
+        BufferedReader layer and its per-chunk allocation; the filled
+        span is then snapshot to bytes, which the downstream consumers
+        (split / decode / translate / frombuffer) require. Also the only
+        read path valid under O_DIRECT, whose aligned buffer file.read()
+        cannot provide.
+        """
+        readinto = getattr(file, 'readinto', None)
+        if readinto is None:
+            # Unusual file object; plain read() still works.
+            while True:
+                chunk = file.read(self.buffer_size)
+                if not chunk: break
+                yield chunk
+            return
+
+        buf = self._new_buffer()
+        mv = memoryview(buf)
+        while True:
+            n = readinto(buf)
+            if not n: break
+            yield bytes(mv[:n])
+
+    def _read_into(self, file, buf):
+        """
+        Generator that fills a preallocated buffer and yields the number of
+        bytes read. Avoids allocating a fresh bytes object per chunk;
+        callers index into buf (e.g. buf.count(b'\\n', 0, n)) instead.
+        """
+        while True:
+            n = file.readinto(buf)
+            if not n: break
+            yield n
+
+    def _read_prefetch(self, file, depth = 2):
+        """
+        Read-ahead generator that yields (buf, n) pairs.
+        A background thread fills the next buffer while the caller is still
+        scanning the current one, so I/O wait overlaps with counting.
+        readinto releases the GIL during the read(2), so the overlap is real.
+        """
+        filled = queue.Queue(maxsize = depth)
+        free = queue.Queue()
+        for _ in range(depth + 1):
+            free.put(self._new_buffer())
+
+        def reader():
+            while True:
+                buf = free.get()
+                try:
+                    n = file.readinto(buf)
+                except Exception as e:
+                    # Hand the error to the consumer; a mid-file failure
+                    # must not look like a clean EOF.
+                    filled.put((e, None))
+                    break
+                filled.put((buf, n))
+                if not n: break
+
+        t = threading.Thread(target = reader, daemon = True)
+        t.start()
+
+        while True:
+            buf, n = filled.get()
+            if n is None:
+                t.join()
+                raise buf
+            if not n: break
+            yield buf, n
+            # Hand the buffer back to the reader for refilling.
+            free.put(buf)
+        t.join()
+
+    # Logical layer
+    def count_bytes(self, file):
+        """
+        Calculates the size of a file in bytes.
+        Callback function for "wc -c <filename>" command.
+        """
+        try:
+            fd = file.fileno()
+            file_stat = os.fstat(fd)
+
+            # If it is a pipe (S_ISFIFO), st_size is 0, so we must read content.
+            if stat.S_ISREG(file_stat.st_mode):
+                # Get file size directly from file descriptor metadata. O(1)
+                return file_stat.st_size
+            
+            else:
+                # Load the whole file into memory.
+                if self.buffer_size == 0:
+                    return len(file.read())
+
+                # Reuse one buffer for every chunk: no per-chunk allocation.
+                buf = self._new_buffer()
+                total = 0
+                for n in self._read_into(file, buf):
+                    total += n
+                return total
+
+        except (OSError, AttributeError):
+            # Fallback to streams that don't support stat (like stdin pipes).
+            if self.buffer_size == 0:
+                return len(file.read())
+
+            buf = self._new_buffer()
+            total = 0
+            for n in self._read_into(file, buf):
+                total += n
+            return total
+        
+    def count_lines(self, file):
+        """
+        Calculates the size of a file in lines.
+        Callback function for "wc -l <filename>" command.
+        """
+        # Load the whole file into memory.
+        if self.buffer_size == 0:
+            return _count_newlines(file.read())
+
+        # Regular files: overlap disk reads with the scan via read-ahead.
+        try:
+            is_regular = stat.S_ISREG(os.fstat(file.fileno()).st_mode)
+        except (OSError, AttributeError):
+            is_regular = False
+
+        # Regular files: map the file and scan it in place — no read(2)
+        # copies at all, just page faults. Scan in buffer_size windows to
+        # stay cache-friendly. Skipped for --direct-io, whose point is to
+        # keep the page cache out of the picture.
+        if is_regular and not self.direct_io:
+            try:
+                with mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ) as mm:
+                    if hasattr(mm, 'madvise'):
+                        mm.madvise(mmap.MADV_SEQUENTIAL)
+                    total = 0
+                    if _ccwc_scan is not None:
+                        # The extension takes any buffer: zero-copy windows.
+                        # (Release the view before the mmap is closed.)
+                        with memoryview(mm) as view:
+                            for off in range(0, len(mm), self.buffer_size):
+                                total += _count_newlines(view[off:off + self.buffer_size])
+                    else:
+                        # bytes.count needs a bytes object; slicing copies
+                        # one window at a time.
+                        for off in range(0, len(mm), self.buffer_size):
+                            total += mm[off:off + self.buffer_size].count(b'\n')
+                    return total
+
+            except (ValueError, OSError):
+                # Empty file or unmappable fd: use the chunked path below.
+                pass
+
+        if is_regular:
+            total = 0
+            for buf, n in self._read_prefetch(file):
+                total += _count_newlines(buf, n)
+            return total
+
+        # Count in-place in the reused buffer; count() takes (sub, start, end)
+        # so the short final chunk needs no slicing either.
+        buf = self._new_buffer()
+        total = 0
+        for n in self._read_into(file, buf):
+            total += _count_newlines(buf, n)
+
+        return total
+
+    def count_words(self, file):
+        """
+        Calculates the size of a file in words.
+        Callback function for "wc -w <filename>" command.
+        """
+        if self.buffer_size == 0:
+            try:
+                content = file.read().decode(self.encoding, errors = 'ignore')
+
+            except LookupError:
+                print(f"Error: Unknown encoding: '{self.encoding}'.")
+                sys.exit(1)
+
+            except Exception:
+                file.seek(0)
+                content = str(file.read())
+
+            return len(content.split())
+
+        total = 0
+        # Check if the previous chunk ended with space.
+        last_char_was_space = True
+
+        if ccwc_kernels.HAVE_NUMPY:
+            # Vectorized: build a whitespace mask over a uint8 view and
+            # count word starts (non-space preceded by space) — no list
+            # of word objects is ever materialized.
+            np = ccwc_kernels.np
+            for chunk in self._read_chunks(file):
+                a = np.frombuffer(chunk, np.uint8)
+                # Same set bytes.split() uses: \t\n\v\f\r and space.
+                is_ws = (a == 0x20) | ((a >= 0x09) & (a <= 0x0d))
+                total += int((is_ws[:-1] & ~is_ws[1:]).sum())
+                # Word starting at the chunk boundary.
+                if last_char_was_space and not is_ws[0]:
+                    total += 1
+                last_char_was_space = bool(is_ws[-1])
+            return total
+
+        # No numpy: translate whitespace to 0 and word bytes to 1 (a tight
+        # C table-lookup loop), then count 0->1 transitions = word starts.
+        # Still no per-word allocations, unlike split().
+        for chunk in self._read_chunks(file):
+            t = chunk.translate(_WS_TBL)
+            total += t.count(b'\x00\x01')
+
+            # Word starting right at the chunk boundary.
+            if last_char_was_space and t[0] == 1:
+                total += 1
+
+            last_char_was_space = t[-1] == 0
+
+        return total
+    
+    def count_chars(self, file):
+        """
+        Calculates the size of a file in characters.
+        Callback function for "wc -m <filename>" command.
+        """
+        # UTF-8 fast path: every character contributes exactly one
+        # non-continuation byte, so chars = bytes - continuation bytes.
+        # No decode, no intermediate str object. count_all and the
+        # compiled counters use the same formula, so the reported count
+        # never depends on which other flags were given.
+        is_utf8 = _is_utf8(self.encoding)
+
+        if self.buffer_size == 0:
+            content = file.read()
+            if is_utf8:
+                return len(content) - _count_continuation(content)
+
+            try:
+                return len(content.decode(self.encoding, errors = 'replace'))
+
+            except LookupError:
+                print(f"Error: Unknown encoding: '{self.encoding}'.")
+                sys.exit(1)
+
+            except Exception:
+                return len(str(content))
+
+        if is_utf8:
+            total_bytes = 0
+            cont = 0
+            for chunk in self._read_chunks(file):
+                total_bytes += len(chunk)
+                cont += _count_continuation(chunk)
+            return total_bytes - cont
+
+        total = 0
+
+        try:
+            # Multi-byte characters that might be split across chunk boundaries.
+            # For example, if a 3-byte character is split [byte1, byte2] | [byte3].
+            # The decoder will hold the first two bytes until the third one arrives.
+            decoder = codecs.getincrementaldecoder(self.encoding)(errors = 'replace')
+            total = 0
+            for chunk in self._read_chunks(file):
+                text = decoder.decode(chunk, final = False)
+                total += len(text)
+            total += len(decoder.decode(b'', final = True))
+            return total
+
+        except LookupError:
+            print(f"Error: Unknown encoding: '{self.encoding}'.")
+            sys.exit(1)
+
+        except Exception:
+            # Fallback if stream is not seekable
+            try:
+                file.seek(0)
+                return len(file.read())
+            except:
+                return 0
+            
+    def _get_counter(self, metrics):
+        """
+        Return a counting callable specialized for the given metrics
+        (an iterable of 'lines'/'words'/'chars'/'bytes').
+        Whole-file mode keeps the generic count_all, which already reads
+        the content exactly once.
+        """
+        metrics = frozenset(metrics)
+        if self.buffer_size == 0:
+            return functools.partial(self.count_all, wanted = metrics)
+        utf8_chars = CHARS in metrics and _is_utf8(self.encoding)
+        return functools.partial(_compile_counter(metrics, utf8_chars), self)
+
+    def count_all(self, file, wanted = frozenset(METRICS)):
+        """
+        Default Option: Calculates lines, words, bytes, and chars in one pass.
+        Optimized for single-pass reading (crucial for pipes/stdin).
+        Only the metrics in `wanted` are computed — above all the UTF-8
+        decoder, which costs more than the other three counters combined
+        and is skipped entirely unless 'chars' was requested.
+        Returns a dict: {'lines': int, 'words': int, 'bytes': int, 'chars': int}
+        (unrequested metrics are reported as 0).
+        """
+        need_lines = LINES in wanted
+        need_words = WORDS in wanted
+        need_chars = CHARS in wanted
+        need_bytes = BYTES in wanted
+
+        # Accumulators live in locals (fast-local loads, no per-chunk
+        # PyDict_SetItem); the result dict is built once at return.
+        lines = 0
+        words = 0
+        chars = 0
+        bytes_ = 0
+        # Helper objects for streaming logic
+        last_char_was_space = True
+        # Same UTF-8 fast path as count_chars, so -m reports the same
+        # count whether or not other flags ride along.
+        utf8_chars = need_chars and _is_utf8(self.encoding)
+        if need_chars and not utf8_chars:
+            try:
+                decoder = codecs.getincrementaldecoder(self.encoding)(errors='replace')
+
+            except LookupError:
+                print(f"Error: Unknown encoding '{self.encoding}'")
+                sys.exit(1)
+
+        if self.buffer_size == 0:
+            content = file.read()
+            if need_lines:
+                lines = _count_newlines(content)
+            if need_bytes:
+                bytes_ = len(content)
+
+            # words
+            if need_words:
+                try:
+                    text_content = content.decode(self.encoding, errors='ignore')
+                    words = len(text_content.split())
+
+                except Exception:
+                    words = len(str(content).split())
+
+            # chars
+            if need_chars:
+                if utf8_chars:
+                    chars = len(content) - _count_continuation(content)
+                else:
+                    try:
+                        chars = len(content.decode(self.encoding, errors = 'replace'))
+
+                    except Exception:
+                        chars = len(str(content))
+
+            return {LINES: lines, WORDS: words, CHARS: chars, BYTES: bytes_}
+
+
+        use_kernel = ccwc_kernels.HAVE_NUMBA and (need_lines or need_words)
+        for chunk in self._read_chunks(file):
+            if need_bytes:
+                bytes_ += len(chunk)
+
+            if use_kernel:
+                # Fused single-pass kernel: lines + words in one traversal.
+                chunk_lines, chunk_words, last_char_was_space = ccwc_kernels.scan(
+                    ccwc_kernels.np.frombuffer(chunk, ccwc_kernels.np.uint8),
+                    last_char_was_space
+                )
+                lines += chunk_lines
+                words += chunk_words
+
+            else:
+                if need_lines:
+                    lines += _count_newlines(chunk)
+
+                # words
+                if need_words:
+                    words += len(chunk.split())
+                    first_char_is_space = chunk[0:1].isspace()
+
+                    if not last_char_was_space and not first_char_is_space:
+                        words -= 1
+
+                    last_char_was_space = chunk[-1:].isspace()
+
+            # chars
+            if utf8_chars:
+                chars += len(chunk) - _count_continuation(chunk)
+            elif need_chars:
+                chars += len(decoder.decode(chunk, final = False))
+        if need_chars and not utf8_chars:
+            chars += len(decoder.decode(b'', final = True))
+
+        return {LINES: lines, WORDS: words, CHARS: chars, BYTES: bytes_}
+            
+# Infrastructure layer
+@contextmanager
+def get_stream(filename = None, direct_io = False):
+    """
+    Context manager that yields a file object.
+    Open a file if filename is provided, otherwise yields stdin buffer.
+    Automatically closes the file if it was opened.
+    Regular files are opened with sequential-read hints to the kernel;
+    direct_io additionally bypasses the page cache via O_DIRECT.
+    """
+    if not filename:
+        yield sys.stdin.buffer
+        return
+
+    try:
+        f = None
+        if direct_io:
+            try:
+                fd = os.open(filename, os.O_RDONLY | os.O_DIRECT)
+                f = open(fd, 'rb', buffering = 0)
+
+            except (AttributeError, OSError):
+                # Platform or filesystem without O_DIRECT support (e.g.
+                # tmpfs); retry with a normal open below, which will
+                # also re-raise genuine errors like a missing file.
+                f = None
+
+        if f is None:
+            f = open(filename, 'rb')
+
+    # The message rides on the SystemExit so produce_count_result can
+    # queue it behind results that were already counted; an uncaught
+    # string exit still reaches the user (printed to stderr, status 1).
+    except FileNotFoundError:
+        sys.exit(f"Error: File '{filename}' not found.")
+
+    except PermissionError:
+        sys.exit(f"Error: Permission denied for reading '{filename}'.")
+
+    except Exception as e:
+        sys.exit(f"Error: An unknown error occurred: {e}")
+
+    # Single-pass scan: tell the kernel to read ahead aggressively...
+    try:
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    except (AttributeError, OSError):
+        pass
+
+    try:
+        yield f
+
+    finally:
+        # ...and not to keep our pages cached once we are done.
+        try:
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+        except (AttributeError, OSError):
+            pass
+        f.close()
+
+# Application layer
+def produce_count_result(args):
+    """Orchestrates the result based on parsed arguments."""
+
+    # Initialize the tool with configuration.
+    direct_io = getattr(args, 'direct_io', False)
+    tool = CCWC(buffer_size = args.buffer_size, encoding = args.encoding,
+                direct_io = direct_io)
+
+    request_commands = []
+    if args.lines: request_commands.append(LINES)
+    if args.words: request_commands.append(WORDS)
+    if args.chars: request_commands.append(CHARS)
+    if args.bytes: request_commands.append(BYTES)
+
+    tool_map = {
+        LINES: tool.count_lines,
+        WORDS: tool.count_words,
+        CHARS: tool.count_chars,
+        BYTES: tool.count_bytes
+    }
+
+    # Default to lines, words, bytes when no flags specified (like wc)
+    if not request_commands:
+        request_commands = [LINES, WORDS, BYTES]
+
+    # None is for stdin.
+    filenames = args.filenames if args.filenames else [None]
+
+    # Specialized for exactly the requested metrics; unneeded counters
+    # (the UTF-8 decoder above all) are absent from the compiled loop.
+    multi_counter = tool._get_counter(frozenset(request_commands))
+
+    def process_one(filename):
+        """Open and count one file; returns its metric dict."""
+        with get_stream(filename, direct_io = direct_io) as f:
+            # Use the specialized multi-metric counter for multi-command.
+            if len(request_commands) > 1:
+                return multi_counter(f)
+
+            # Single flag → use dedicated function (avoids unnecessary computation).
+            metric = request_commands[0]
+            return {metric: tool_map[metric](f)}
+
+    # File reads release the GIL, so multi-file runs overlap their I/O in
+    # a thread pool. Single file (or stdin) stays on the main thread.
+    if len(filenames) > 1:
+        with ThreadPoolExecutor(max_workers = min(8, len(filenames))) as executor:
+            pending = [(filename, executor.submit(process_one, filename))
+                       for filename in filenames]
+    else:
+        pending = [(filenames[0], None)]
+
+    # Resolve the requested metrics once; itemgetter pulls them out of
+    # each counter dict in C instead of a per-file Python lookup loop.
+    # (itemgetter with one key returns a scalar, so wrap it in a tuple.)
+    if len(request_commands) > 1:
+        get_requested = operator.itemgetter(*request_commands)
+    else:
+        get_requested = lambda counter, _get = operator.itemgetter(request_commands[0]): (_get(counter),)
+
+    # Buffer all report lines and emit them with one write(2) at the end
+    # instead of one print (and potentially one syscall) per file.
+    out_lines = []
+
+    def flush_output():
+        if out_lines:
+            sys.stdout.write('\n'.join(out_lines) + '\n')
+
+    total_counter = dict.fromkeys(request_commands, 0)
+    # Report in submission order regardless of completion order.
+    for filename, future in pending:
+        try:
+            file_counter = future.result() if future else process_one(filename)
+
+        except SystemExit as e:
+            # Emit what was already counted before the fatal error, with
+            # a get_stream message (carried as the exit code) queued in
+            # its submission-order place behind those results.
+            if isinstance(e.code, str):
+                out_lines.append(e.code)
+                flush_output()
+                sys.exit(1)
+            flush_output()
+            raise
+
+        except Exception as e:
+            out_lines.append(f"Error during processing file '{filename}': {e}")
+            continue
+
+        values = get_requested(file_counter)
+
+        # Update totals
+        for metric, value in zip(request_commands, values):
+            total_counter[metric] += value
+
+        if len(request_commands) > 1:
+            outputs = ' '.join(map(str, values))
+            if filename:
+                out_lines.append(f" {outputs} {filename}")
+            else:
+                out_lines.append(f" {outputs}")
+                flush_output()
+                return # stdin: single input, no totals needed
+
+        else:
+            if filename:
+                out_lines.append(f"  {values[0]} {filename}")
+            else:
+                out_lines.append(f"  {values[0]}")
+                flush_output()
+                return # stdin: single input, no totals needed
+
+
+    # Print total if multiple files were processed.
+    if len(filenames) > 1:
+        outputs = ' '.join(map(str, get_requested(total_counter)))
+        out_lines.append(f" {outputs} total")
+
+    flush_output()
+
+# Interface layer
+# Short flags understood by the fast-path parser in main().
+_SHORT_FLAGS = {'-l': LINES, '-c': BYTES, '-w': WORDS, '-m': CHARS}
+
+def parse_args_fast(argv):
+    """
+    Hand-rolled parser for the common invocation shape: short flags plus
+    filenames. Building a full ArgumentParser costs several milliseconds
+    of object construction, which dominates total runtime on small files.
+    Returns a namespace compatible with produce_count_result, or None if
+    argv uses anything beyond the fast flag set (long options, combined
+    flags, --help, ...) so the caller falls back to argparse.
+    """
+    if not all(a in _SHORT_FLAGS or not a.startswith('-') for a in argv):
+        return None
+
+    from types import SimpleNamespace
+    flags = [_SHORT_FLAGS[a] for a in argv if a in _SHORT_FLAGS]
+    return SimpleNamespace(
+        lines = LINES in flags,
+        words = WORDS in flags,
+        chars = CHARS in flags,
+        bytes = BYTES in flags,
+        filenames = [a for a in argv if not a.startswith('-')],
+        buffer_size = CCWC.DEFAULT_BUFFER_SIZE,
+        encoding = 'utf-8',
+        direct_io = False
+    )
+
+def create_parser():
+    """Creates and configures the argument parser."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description = "ccsc - Build your own wc tool.",
+        prog = "ccwc"
+    )
+
+    parser.add_argument("-c", "--bytes", action = "store_true", help = "print the byte counts")
+    parser.add_argument("-l", "--lines", action = "store_true", help = "print the newline counts")
+    parser.add_argument("-w", "--words", action = "store_true", help = "print the word counts")
+    parser.add_argument("-m", "--chars", action = "store_true", help = "print the character counts")
+
+    parser.add_argument(
+        "--buffer-size",
+        type = int,
+        default = CCWC.DEFAULT_BUFFER_SIZE,
+        help="buffer size in bytes (default: 65536). Set 0 to read entire file at once."
+    )
+
+    parser.add_argument(
+        "--direct-io",
+        action = "store_true",
+        help = "bypass the page cache with O_DIRECT (falls back to normal reads if unsupported)"
+    )
+
+    parser.add_argument(
+        "--encoding",
+        default = 'utf-8',
+        help="encoding (default: utf-8)"
+    )
+
+    parser.add_argument(
+        "filenames",
+        nargs = '*',
+        help = "files to process (default: stdin)"
+    )
+
+    return parser
+
+# Entry point
+def main():
+    """
+    Main entry point for the ccwc tool.
+    Parsed command-line arguments and executes the requested operation.
+    """
+    args = parse_args_fast(sys.argv[1:])
+    if args is None:
+        # Long options or anything unusual: pay the argparse cost.
+        parser = create_parser()
+        args = parser.parse_args()
+    try:
+        produce_count_result(args)
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+if __name__ == "__main__":
     main()
\ No newline at end of file
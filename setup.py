@@ -0,0 +1,10 @@
+from setuptools import setup, Extension
+
+# The extension is a pure speedup; optional=True keeps the install
+# working on systems without a C compiler (ccwc falls back to
+# bytes.count at import time).
+setup(
+    ext_modules = [
+        Extension("_ccwc_scan", sources = ["_ccwc_scan.c"], optional = True),
+    ],
+)